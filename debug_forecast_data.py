@@ -18,6 +18,16 @@ if not SUPABASE_URL or not SUPABASE_KEY:
 
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 
+# Time slot shown for each hour of the day (index = hour). Matches the
+# predictions page: 2-hour slots from 6am to 6pm, '6am' outside that window.
+SLOT_FOR_HOUR = (
+    ('6am',) * 8 +                    # 0-7
+    ('8am', '8am', '10am', '10am',    # 8-11
+     '12pm', '12pm', '2pm', '2pm',    # 12-15
+     '4pm', '4pm', '6pm', '6pm') +    # 16-19
+    ('6am',) * 4                      # 20-23
+)
+
 def debug_forecast_data():
     """Debug forecast data availability"""
     print("🔍 DEBUGGING FORECAST DATA AVAILABILITY")
@@ -59,16 +69,7 @@ def debug_forecast_data():
             print(f"🕐 Current hour: {current_hour}")
             
             # Determine expected time slot
-            time_slots = ['6am', '8am', '10am', '12pm', '2pm', '4pm', '6pm']
-            expected_time = '6am'  # Default
-            
-            if 6 <= current_hour < 8: expected_time = '6am'
-            elif 8 <= current_hour < 10: expected_time = '8am'
-            elif 10 <= current_hour < 12: expected_time = '10am'
-            elif 12 <= current_hour < 14: expected_time = '12pm'
-            elif 14 <= current_hour < 16: expected_time = '2pm'
-            elif 16 <= current_hour < 18: expected_time = '4pm'
-            elif 18 <= current_hour < 20: expected_time = '6pm'
+            expected_time = SLOT_FOR_HOUR[current_hour]
             
             print(f"🎯 Expected time slot: {expected_time}")
             
@@ -126,13 +127,7 @@ def test_predictions_query():
         today = date.today().isoformat()
         current_hour = datetime.now().hour
         
-        time_of_day = '6am'
-        if current_hour >= 8 and current_hour < 10: time_of_day = '8am'
-        elif current_hour >= 10 and current_hour < 12: time_of_day = '10am'
-        elif current_hour >= 12 and current_hour < 14: time_of_day = '12pm'
-        elif current_hour >= 14 and current_hour < 16: time_of_day = '2pm'
-        elif current_hour >= 16 and current_hour < 18: time_of_day = '4pm'
-        elif current_hour >= 18 and current_hour < 20: time_of_day = '6pm'
+        time_of_day = SLOT_FOR_HOUR[current_hour]
         
         print(f"📅 Query params:")
         print(f"   Date: {today}")
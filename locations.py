@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+Australian surf regions and the WillyWeather locations their forecasts come from.
+"""
+
+from types import MappingProxyType
+from typing import NamedTuple
+
+class Location(NamedTuple):
+    location_id: int
+    state: str
+
+# (region, WillyWeather location ID, state) - region names must match surf_breaks.region
+LOCATIONS = (
+    ("Gold Coast", 3690, "QLD"),
+    ("Byron Bay", 3690, "NSW"),        # Same API endpoint as Gold Coast/Far North Coast
+    ("Wollongong", 17663, "NSW"),
+    ("South Coast", 17621, "NSW"),     # Merimbula
+    ("Far North Coast", 3690, "NSW"),  # Same as Byron Bay
+    ("Central Coast", 17648, "NSW"),   # Gosford area
+)
+
+# Australian surf locations with their WillyWeather location IDs
+AUSTRALIAN_SURF_LOCATIONS = MappingProxyType({
+    region: Location(location_id, state) for region, location_id, state in LOCATIONS
+})
+
+# Flat region -> location ID lookup for the scrape loop (state is never needed there)
+LOCATION_IDS = MappingProxyType({region: location_id for region, location_id, _ in LOCATIONS})
+VALID_REGIONS = frozenset(LOCATION_IDS)
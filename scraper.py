@@ -5,404 +5,704 @@ with correct hourly time mapping from 24-hour WillyWeather API data.
 """
 
 import os
+import functools
+import hashlib
+import logging
+import shelve
+import orjson
 import requests
-import schedule
+import threading
 import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datetime import datetime, date, timedelta
-from supabase import create_client, Client
+from types import MappingProxyType
 from dotenv import load_dotenv
+from locations import LOCATION_IDS, VALID_REGIONS
 
 # Load environment variables
 load_dotenv()
 
-# Initialize Supabase
+log = logging.getLogger("scraper")
+
+# Supabase credentials (the client itself is created lazily by get_supabase)
 SUPABASE_URL = os.getenv("NEXT_PUBLIC_SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_KEY")
 
-if not SUPABASE_URL or not SUPABASE_KEY:
-    print("❌ Missing Supabase credentials")
-    exit(1)
+@functools.lru_cache(maxsize=1)
+def get_supabase():
+    """Create the Supabase client on first use and reuse it afterwards"""
+    # Imported here so importing this module doesn't pull in postgrest/httpx
+    import httpx
+    from supabase import create_client
+    from supabase.lib.client_options import ClientOptions
+
+    if not SUPABASE_URL or not SUPABASE_KEY:
+        log.error("❌ Missing Supabase credentials")
+        exit(1)
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+    # Fail fast on a stalled connect rather than hanging a run on PostgREST
+    options = ClientOptions(postgrest_client_timeout=httpx.Timeout(10.0, connect=3.0))
+    return create_client(SUPABASE_URL, SUPABASE_KEY, options=options)
 
 # WillyWeather API configuration
 WILLY_WEATHER_API_KEY = os.getenv("WILLY_WEATHER_API_KEY")
 BASE_URL = "https://api.willyweather.com.au/v2"
 
-# Australian surf locations with their WillyWeather location IDs
-AUSTRALIAN_SURF_LOCATIONS = {
-    "Gold Coast": {"location_id": 3690, "state": "QLD"},
-    "Byron Bay": {"location_id": 3690, "state": "NSW"},       # Same API endpoint as Gold Coast/Far North Coast
-    "Wollongong": {"location_id": 17663, "state": "NSW"},
-    "South Coast": {"location_id": 17621, "state": "NSW"},     # Merimbula
-    "Far North Coast": {"location_id": 3690, "state": "NSW"},  # Same as Byron Bay
-    "Central Coast": {"location_id": 17648, "state": "NSW"},   # Gosford area
+# Number of forecast days to request. Every day returned is turned into records,
+# so deployments that only need today's conditions can set FORECAST_DAYS=1 to
+# shrink the payload instead of downloading days that are never stored.
+FORECAST_DAYS = int(os.getenv("FORECAST_DAYS", "3"))
+
+# Ask for compressed responses explicitly; the forecast JSON compresses well and
+# brotli (installed via requirements) lets requests decode "br" transparently.
+REQUEST_HEADERS = {
+    'Accept': 'application/json',
+    'Accept-Encoding': 'br, gzip',
+    'User-Agent': 'surf-scraper/1.0',
 }
 
+# (connect, read) timeouts for WillyWeather requests
+REQUEST_TIMEOUT = (3.05, 27)
+
+# Region fetches run concurrently, paced to at most MAX_REQUESTS_PER_SECOND.
+# Both can be tuned per deployment to match the WillyWeather plan's quota.
+MAX_FETCH_WORKERS = int(os.getenv("SCRAPER_WORKERS", "8"))
+MAX_REQUESTS_PER_SECOND = int(os.getenv("SCRAPER_MAX_RPS", "5"))
+
+# Fast mode only collects the required swell/wind fields and skips tides
+# (not requested from the API, no per-slot tide lookups); tide columns stay empty.
+FAST_MODE = os.getenv("FAST_MODE", "false").lower() == "true"
+
+# Timestamped, levelled log lines; the thread name tells concurrent region fetches apart
+LOG_FORMAT = os.getenv("LOG_FORMAT", "%(asctime)s %(levelname)s [%(threadName)s] %(message)s")
+
+# UPDATED: Scraper runs every 4 hours (was 6 hours)
+RUN_INTERVAL_HOURS = 4
+
+# Per-location scrape state (last successful save, payload hash and the ETag /
+# Last-Modified validators) survives restarts here, so a redeploy shortly after a
+# run doesn't re-fetch everything and later fetches stay conditional. Keep
+# MIN_REFRESH_HOURS below the 4-hour schedule so scheduled runs always refresh.
+STATE_FILE = os.getenv("SCRAPER_STATE_FILE", "scraper_state")
+MIN_REFRESH_HOURS = float(os.getenv("MIN_REFRESH_HOURS", "3"))
+
+# Circuit breaker: a location whose fetch fails this many runs in a row is
+# skipped for LOCATION_COOLDOWN_HOURS instead of costing retries every run
+MAX_CONSECUTIVE_FAILURES = int(os.getenv("MAX_CONSECUTIVE_FAILURES", "3"))
+LOCATION_COOLDOWN_HOURS = float(os.getenv("LOCATION_COOLDOWN_HOURS", "24"))
+
+# Surf breaks change rarely, so the (id, region) lookup is reused across
+# scheduled runs until it is this old. The default must stay well above the run
+# interval (here 6 runs, i.e. a day) or every run finds it expired. Set to 0 to
+# query Supabase every run.
+BREAKS_CACHE_TTL_SECONDS = float(os.getenv("BREAKS_CACHE_TTL_SECONDS", str(RUN_INTERVAL_HOURS * 3600 * 6)))
+
+# Unique key of forecast_data used for bulk upserts
+FORECAST_CONFLICT_COLUMNS = 'break_id,forecast_date,forecast_time'
+
+# Rows per upsert request, keeping each request well under PostgREST's payload limits
+UPSERT_BATCH_SIZE = 500
+
+# Upsert batches sent to Supabase at the same time
+MAX_SAVE_WORKERS = int(os.getenv("SCRAPER_SAVE_WORKERS", "4"))
+
+# forecast_data column -> WillyWeather entry field
+SWELL_FIELD_MAP = (
+    ('swell_height', 'height'),
+    ('swell_direction', 'direction'),
+    ('swell_period', 'period'),
+)
+WIND_FIELD_MAP = (
+    ('wind_speed', 'speed'),
+    ('wind_direction', 'direction'),
+)
+
+# FIXED: Map specific hours to your desired time slots
+HOUR_TO_TIME_SLOT = MappingProxyType({
+    6: '6am',    # 6am entry
+    8: '8am',    # 8am entry
+    10: '10am',  # 10am entry
+    12: '12pm',  # 12pm entry
+    14: '2pm',   # 2pm entry (14:00)
+    16: '4pm',   # 4pm entry (16:00)
+    18: '6pm',   # 6pm entry (18:00)
+    20: '8pm'    # 8pm entry (20:00)
+})
+
+# Time slot -> (start, end) hours its tide height is averaged over
+TIME_SLOT_HOURS = MappingProxyType({
+    time_slot: (hour, hour + 2) for hour, time_slot in HOUR_TO_TIME_SLOT.items()
+})
+
+# Forecast sections requested from WillyWeather
+FORECAST_TYPES = ('swell', 'wind', 'tides')
+
+def index_forecast_days(forecasts):
+    """Map each forecast type to {YYYY-MM-DD: entries} for its days"""
+    return {
+        forecast_type: {
+            day['dateTime'][:10]: day.get('entries', [])
+            for day in forecast_days(forecasts, forecast_type)
+        }
+        for forecast_type in FORECAST_TYPES
+    }
+
+# Returned for a 304 when only the persisted payload hash survived a restart
+NOT_MODIFIED_PAYLOAD = MappingProxyType({'forecasts': {}})
+
+# The only per-entry fields any forecast type is read for
+FORECAST_ENTRY_FIELDS = ('dateTime', 'height', 'direction', 'period', 'speed')
+
+def forecast_days(forecasts, forecast_type):
+    """A forecast type's days, whether the API sent {'days': [...]}, a bare list or nothing"""
+    section = forecasts.get(forecast_type)
+    if isinstance(section, dict):
+        return section.get('days') or []
+    if isinstance(section, list):
+        return section
+    return []
+
+def narrow_forecast_payload(data):
+    """Keep only the forecast days/entry fields we read, dropping location and metadata"""
+    forecasts = data.get('forecasts') or {}
+    return {
+        'forecasts': {
+            forecast_type: {
+                'days': [
+                    {
+                        **day,
+                        'entries': [
+                            {field: entry[field] for field in FORECAST_ENTRY_FIELDS if field in entry}
+                            for entry in day.get('entries', [])
+                        ],
+                    }
+                    for day in forecast_days(forecasts, forecast_type)
+                ]
+            }
+            for forecast_type in FORECAST_TYPES
+        }
+    }
+
+def entry_hour(entry):
+    """Hour of an entry's dateTime, or None if it is missing or malformed"""
+    # WillyWeather stamps are "YYYY-MM-DD HH:MM:SS", so the hour sits at a fixed offset
+    entry_datetime = entry.get('dateTime')
+    if not entry_datetime or not entry_datetime[11:13].isdigit():
+        return None
+    return int(entry_datetime[11:13])
+
+def index_entries_by_hour(entries):
+    """Map hour -> (position, entry) for a day's entries, keeping the first entry per hour"""
+    by_hour = {}
+    for position, entry in enumerate(entries):
+        hour = entry_hour(entry)
+        if hour is not None and hour not in by_hour:
+            by_hour[hour] = (position, entry)
+    return by_hour
+
+class RateLimiter:
+    """Thread-safe token bucket: bursts of up to max_calls, refilled at max_calls per period seconds"""
+    def __init__(self, max_calls, period=1.0):
+        self.capacity = max_calls
+        self.refill_rate = max_calls / period  # tokens per second
+        self.tokens = float(max_calls)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def wait(self):
+        """Block until a token is available, then take it"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                delay = (1 - self.tokens) / self.refill_rate
+            time.sleep(delay)
+
+@functools.lru_cache(maxsize=1)
+def get_session():
+    """Create the pooled WillyWeather session on first use and share it process-wide"""
+    # One pooled session for every region (and every scraper instance) so the TLS
+    # connection to api.willyweather.com.au is reused instead of re-handshaking per
+    # request. The pool matches the fetch workers and blocks when exhausted, so
+    # concurrent fetches share warm connections instead of opening extras.
+    session = requests.Session()
+    session.mount('https://', HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=MAX_FETCH_WORKERS,
+        pool_block=True,
+        max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
+    ))
+    session.headers.update(REQUEST_HEADERS)
+    return session
+
 class WillyWeatherScraper:
     def __init__(self):
         self.api_key = WILLY_WEATHER_API_KEY
         self.base_url = BASE_URL
+        self.payload_hashes = {}  # location_id -> sha256 of the last fetched body
+        self.cache_validators = {}  # location_id -> {'etag': ..., 'last_modified': ...}
+        self.last_payloads = {}  # location_id -> last parsed 200 response, replayed on 304
         
-    def get_all_breaks_by_region(self, region_name):
-        """Get ALL surf breaks for a given region"""
-        try:
-            response = supabase.table('surf_breaks').select('id, name, region').eq('region', region_name).execute()
-            
-            if response.data:
-                print(f"✅ Found {len(response.data)} breaks in {region_name}:")
-                for break_data in response.data:
-                    print(f"  - {break_data['name']} (ID: {break_data['id']})")
-                return response.data
-            else:
-                print(f"❌ No surf breaks found for region: {region_name}")
-                return []
-                
-        except Exception as e:
-            print(f"❌ Error getting breaks for {region_name}: {str(e)}")
-            return []
+        self.session = get_session()
+        self.rate_limiter = RateLimiter(MAX_REQUESTS_PER_SECOND)
         
-    def get_forecast_data(self, location_id, region_name):
-        """Get forecast data from WillyWeather API"""
+    def get_forecast_data(self, location_id, region_name, start_date=None):
+        """Get forecast data from WillyWeather API, starting at start_date (YYYY-MM-DD, default today)"""
         try:
-            print(f"🌊 Fetching forecast for {region_name} (ID: {location_id})")
+            log.info("🌊 Fetching forecast for %s (ID: %s)", region_name, location_id)
             
             # API endpoint for weather forecast
             url = f"{self.base_url}/{self.api_key}/locations/{location_id}/weather.json"
             
             # Parameters for swell, wind, and tide forecasts
             params = {
-                'forecasts': 'swell,wind,tides',
-                'days': 3,
-                'startDate': date.today().strftime('%Y-%m-%d')
+                'forecasts': 'swell,wind' if FAST_MODE else ','.join(FORECAST_TYPES),
+                'days': FORECAST_DAYS,
+                'startDate': start_date or date.today().isoformat()
             }
             
-            response = requests.get(url, params=params, timeout=30)
+            # Conditional request: an unchanged forecast comes back as an empty 304
+            headers = {}
+            validators = self.cache_validators.get(location_id, {})
+            if validators.get('etag'):
+                headers['If-None-Match'] = validators['etag']
+            if validators.get('last_modified'):
+                headers['If-Modified-Since'] = validators['last_modified']
+            
+            self.rate_limiter.wait()
+            response = self.session.get(url, params=params, headers=headers, timeout=REQUEST_TIMEOUT)
+            
+            # After a restart only the persisted hash is known; the unchanged hash
+            # then makes run_scraper skip the save, so no payload is needed
+            if response.status_code == 304 and (location_id in self.last_payloads or location_id in self.payload_hashes):
+                log.info("♻️  Forecast for %s not modified since last fetch", region_name)
+                return self.last_payloads.get(location_id, NOT_MODIFIED_PAYLOAD)
             
             if response.status_code == 200:
-                print(f"✅ Successfully fetched forecast data for {region_name}")
-                return response.json()
+                log.info("✅ Successfully fetched forecast data for %s (encoding: %s, bytes: %s)",
+                         region_name,
+                         response.headers.get('Content-Encoding', 'identity'),
+                         response.headers.get('Content-Length', 'unknown'))
+                self.payload_hashes[location_id] = hashlib.sha256(response.content).hexdigest()
+                self.cache_validators[location_id] = {
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified')
+                }
+                # Only the narrowed copy is kept around for 304 responses
+                self.last_payloads[location_id] = narrow_forecast_payload(orjson.loads(response.content))
+                return self.last_payloads[location_id]
             else:
-                print(f"❌ Failed to fetch forecast: HTTP {response.status_code}")
+                log.error("❌ Failed to fetch forecast: HTTP %s", response.status_code)
                 return None
                 
         except Exception as e:
-            print(f"❌ Error fetching forecast for {region_name}: {str(e)}")
+            log.error("❌ Error fetching forecast for %s: %s", region_name, e)
             return None
 
-    def get_tide_height_for_time_slot(self, tide_data, forecast_date, time_slot):
-        """Extract tide height and direction for a specific 2-hour time slot from tide data"""
-        if not tide_data or not tide_data.get('days'):
+    def get_tide_height_for_time_slot(self, tide_points, time_slot):
+        """Extract tide height and direction for a specific 2-hour time slot from a day's (hour, height) tide points"""
+        if not tide_points:
             return None, None
         
-        # Map time slots to start and end hours
-        time_to_hours = {
-            '6am': (6, 8),   # 6am-8am
-            '8am': (8, 10),  # 8am-10am
-            '10am': (10, 12), # 10am-12pm
-            '12pm': (12, 14), # 12pm-2pm
-            '2pm': (14, 16),  # 2pm-4pm
-            '4pm': (16, 18),  # 4pm-6pm
-            '6pm': (18, 20),  # 6pm-8pm
-            '8pm': (20, 22)   # 8pm-10pm
-        }
-        
-        hours_range = time_to_hours.get(time_slot)
+        hours_range = TIME_SLOT_HOURS.get(time_slot)
         if hours_range is None:
             return None, None
         
         start_hour, end_hour = hours_range
         
-        # Find the day matching our forecast date
-        for tide_day in tide_data['days']:
-            if tide_day['dateTime'][:10] == forecast_date:
-                entries = tide_day.get('entries', [])
-                
-                # Find entries for start and end of time slot
-                start_tide = None
-                end_tide = None
-                start_time_diff = float('inf')
-                end_time_diff = float('inf')
-                
-                for entry in entries:
-                    entry_datetime = entry.get('dateTime')
-                    if entry_datetime and 'height' in entry:
-                        try:
-                            # Parse the datetime string
-                            entry_dt = datetime.fromisoformat(entry_datetime.replace('Z', '+00:00'))
-                            entry_hour = entry_dt.hour
-                            
-                            # Check if this is closest to start hour
-                            start_diff = abs(entry_hour - start_hour)
-                            if start_diff < start_time_diff:
-                                start_time_diff = start_diff
-                                start_tide = entry['height']
-                            
-                            # Check if this is closest to end hour
-                            end_diff = abs(entry_hour - end_hour)
-                            if end_diff < end_time_diff:
-                                end_time_diff = end_diff
-                                end_tide = entry['height']
-                                
-                        except:
-                            continue
-                
-                # Calculate average tide height and direction
-                if start_tide is not None and end_tide is not None:
-                    avg_tide = (start_tide + end_tide) / 2
-                    
-                    # Determine tide direction
-                    tide_diff = end_tide - start_tide
-                    if tide_diff > 0.1:  # Rising by more than 10cm
-                        tide_direction = "Rising"
-                    elif tide_diff < -0.1:  # Falling by more than 10cm
-                        tide_direction = "Falling"
-                    else:  # Change is less than 10cm
-                        tide_direction = "Stable"
-                    
-                    return avg_tide, tide_direction
-                    
-                elif start_tide is not None:
-                    # Only have start tide
-                    return start_tide, "Unknown"
-                elif end_tide is not None:
-                    # Only have end tide
-                    return end_tide, "Unknown"
-                    
+        # Closest tide points to the start and end of the time slot
+        start_tide = min(tide_points, key=lambda point: abs(point[0] - start_hour))[1]
+        end_tide = min(tide_points, key=lambda point: abs(point[0] - end_hour))[1]
+        
+        # Calculate average tide height and direction
+        if start_tide is not None and end_tide is not None:
+            avg_tide = (start_tide + end_tide) / 2
+            
+            # Determine tide direction
+            tide_diff = end_tide - start_tide
+            if tide_diff > 0.1:  # Rising by more than 10cm
+                tide_direction = "Rising"
+            elif tide_diff < -0.1:  # Falling by more than 10cm
+                tide_direction = "Falling"
+            else:  # Change is less than 10cm
+                tide_direction = "Stable"
+            
+            return avg_tide, tide_direction
+            
+        elif start_tide is not None:
+            # Only have start tide
+            return start_tide, "Unknown"
+        elif end_tide is not None:
+            # Only have end tide
+            return end_tide, "Unknown"
+            
         return None, None
 
     def process_forecast_data(self, api_data, region_name, all_breaks):
         """Process API data and create forecast records for ALL breaks in the region"""
         try:
-            print(f"📊 Processing forecast data for {len(all_breaks)} breaks in {region_name}")
+            log.info("📊 Processing forecast data for %d breaks in %s", len(all_breaks), region_name)
             
-            forecasts = api_data.get('forecasts', {})
-            swell_data = forecasts.get('swell')
-            wind_data = forecasts.get('wind')
-            tide_data = forecasts.get('tides')
+            # date -> entries for every forecast type, so matching a swell day to
+            # its wind and tide days is a dict lookup instead of a scan per type
+            days_by_type = index_forecast_days(api_data.get('forecasts', {}))
+            swell_days = days_by_type['swell']
             
-            if not swell_data or not swell_data.get('days'):
-                print(f"❌ No swell data available for {region_name}")
+            if not swell_days:
+                log.error("❌ No swell data available for %s", region_name)
                 return []
             
             all_forecast_records = []
             
             # Process each day's forecast
-            for day in swell_data['days']:
-                forecast_date = day['dateTime'][:10]  # Extract YYYY-MM-DD
-                
-                # Get all entries for the day (24 hourly entries)
-                day_entries = day.get('entries', [])
-                wind_entries = []
-                
-                print(f"📅 {forecast_date}: Found {len(day_entries)} hourly entries")
-                
-                # Get corresponding wind data
-                if wind_data and wind_data.get('days'):
-                    for wind_day in wind_data['days']:
-                        if wind_day['dateTime'][:10] == forecast_date:
-                            wind_entries = wind_day.get('entries', [])
-                            break
-                
-                # FIXED: Map specific hours to your desired time slots
-                hour_to_timeslot = {
-                    6: '6am',    # 6am entry
-                    8: '8am',    # 8am entry  
-                    10: '10am',  # 10am entry
-                    12: '12pm',  # 12pm entry
-                    14: '2pm',   # 2pm entry (14:00)
-                    16: '4pm',   # 4pm entry (16:00)
-                    18: '6pm',   # 6pm entry (18:00)
-                    20: '8pm'    # 8pm entry (20:00)
-                }
-                
-                # Process each desired time slot
-                for hour, time_slot in hour_to_timeslot.items():
-                    try:
+            for forecast_date, day_entries in swell_days.items():
+                # A malformed day is skipped as a whole; entries are checked explicitly
+                try:
+                    # Corresponding wind and tide entries for the same day
+                    wind_entries = days_by_type['wind'].get(forecast_date, [])
+                    tide_entries = days_by_type['tides'].get(forecast_date, [])
+                    
+                    log.debug("📅 %s: Found %d hourly entries", forecast_date, len(day_entries))
+                    
+                    # Parse each day's timestamps once rather than once per time slot
+                    swell_by_hour = index_entries_by_hour(day_entries)
+                    tide_points = [
+                        (hour, entry['height'])
+                        for entry in tide_entries
+                        if 'height' in entry and (hour := entry_hour(entry)) is not None
+                    ]
+                    
+                    day_records = []
+                    
+                    # Process each desired time slot
+                    for hour, time_slot in HOUR_TO_TIME_SLOT.items():
                         # Find the entry for this specific hour
-                        target_entry = None
-                        target_wind = None
-                        
-                        for i, entry in enumerate(day_entries):
-                            entry_datetime = entry.get('dateTime')
-                            if entry_datetime:
-                                try:
-                                    dt = datetime.fromisoformat(entry_datetime.replace('Z', '+00:00'))
-                                    if dt.hour == hour:
-                                        target_entry = entry
-                                        # Get corresponding wind entry
-                                        if i < len(wind_entries):
-                                            target_wind = wind_entries[i]
-                                        break
-                                except:
-                                    continue
+                        position, target_entry = swell_by_hour.get(hour, (None, None))
                         
                         if not target_entry:
-                            print(f"⚠️ No data found for {time_slot} ({hour}:00)")
+                            log.warning("⚠️ No data found for %s (%s:00)", time_slot, hour)
                             continue
                         
-                        print(f"✅ Found data for {time_slot}: {target_entry.get('height')}m")
+                        log.debug("✅ Found data for %s: %sm", time_slot, target_entry.get('height'))
                         
-                        # Get tide height for this specific time slot
-                        tide_height, tide_direction = self.get_tide_height_for_time_slot(
-                            tide_data, forecast_date, time_slot
-                        )
+                        # Get corresponding wind entry
+                        target_wind = wind_entries[position] if position < len(wind_entries) else None
+                        
+                        # Get tide height for this specific time slot (optional in fast mode)
+                        if FAST_MODE:
+                            tide_height, tide_direction = None, None
+                        else:
+                            tide_height, tide_direction = self.get_tide_height_for_time_slot(
+                                tide_points, time_slot
+                            )
+                        
+                        # Everything except break_id is identical for every break in
+                        # the region, so build the slot's fields once
+                        wind_entry = target_wind or {}
+                        slot_record = {
+                            'forecast_date': forecast_date,
+                            'forecast_time': time_slot,
+                            **{column: target_entry.get(field) for column, field in SWELL_FIELD_MAP},
+                            **{column: wind_entry.get(field) for column, field in WIND_FIELD_MAP},
+                            'tide_height': tide_height,
+                            'tide_direction': tide_direction
+                        }
                         
                         # CREATE A FORECAST RECORD FOR EACH BREAK IN THE REGION
-                        for break_data in all_breaks:
-                            record = {
-                                'break_id': break_data['id'],
-                                'forecast_date': forecast_date,
-                                'forecast_time': time_slot,
-                                'swell_height': target_entry.get('height'),
-                                'swell_direction': target_entry.get('direction'),
-                                'swell_period': target_entry.get('period'),
-                                'wind_speed': target_wind.get('speed') if target_wind else None,
-                                'wind_direction': target_wind.get('direction') if target_wind else None,
-                                'tide_height': tide_height,
-                                'tide_direction': tide_direction
-                            }
-                            
-                            all_forecast_records.append(record)
-                            
-                    except Exception as e:
-                        print(f"⚠️ Error processing {time_slot}: {str(e)}")
-                        continue
+                        day_records.extend(
+                            {'break_id': break_data['id'], **slot_record} for break_data in all_breaks
+                        )
+                    
+                    all_forecast_records.extend(day_records)
+                    
+                except Exception as e:
+                    log.warning("⚠️ Error processing %s: %s", forecast_date, e)
+                    continue
             
-            print(f"✅ Generated {len(all_forecast_records)} forecast records")
+            log.info("✅ Generated %d forecast records", len(all_forecast_records))
             return all_forecast_records
             
         except Exception as e:
-            print(f"❌ Error processing forecast data: {str(e)}")
+            log.error("❌ Error processing forecast data: %s", e)
             return []
 
+    def upsert_forecast_batch(self, batch):
+        """Upsert one batch of forecast records and return how many were sent"""
+        # Upsert data (insert or update if exists). With returning='minimal'
+        # PostgREST sends no rows back; a failed batch raises instead.
+        get_supabase().table('forecast_data').upsert(
+            batch,
+            on_conflict=FORECAST_CONFLICT_COLUMNS,
+            returning='minimal'
+        ).execute()
+        return len(batch)
+
     def save_forecast_data(self, forecast_records):
-        """Save forecast data to Supabase"""
+        """Save forecast records to Supabase with bulk upserts of up to UPSERT_BATCH_SIZE rows"""
         try:
-            print(f"💾 Saving {len(forecast_records)} forecast records...")
+            log.info("💾 Saving %d forecast records...", len(forecast_records))
             
-            # Upsert data (insert or update if exists)
-            response = supabase.table('forecast_data').upsert(
-                forecast_records,
-                on_conflict='break_id, forecast_date, forecast_time'
-            ).execute()
+            batches = [
+                forecast_records[start:start + UPSERT_BATCH_SIZE]
+                for start in range(0, len(forecast_records), UPSERT_BATCH_SIZE)
+            ]
             
-            if response.data:
-                print(f"✅ Successfully saved {len(response.data)} forecast records")
-                return True
-            else:
-                print("❌ No data returned from save operation")
-                return False
+            # Each upsert is a blocking PostgREST round-trip, so send batches in parallel
+            with ThreadPoolExecutor(max_workers=max(1, min(MAX_SAVE_WORKERS, len(batches)))) as executor:
+                saved_count = sum(executor.map(self.upsert_forecast_batch, batches))
+            
+            log.info("✅ Successfully saved %d forecast records", saved_count)
+            return True
                 
         except Exception as e:
-            print(f"❌ Error saving forecast data: {str(e)}")
+            log.error("❌ Error saving forecast data: %s", e)
             return False
 
-def get_unique_regions_from_database():
-    """Get list of unique regions that have surf breaks in the database"""
+# (expires_at, breaks_by_region) from the last successful surf_breaks query
+_breaks_cache = (0.0, None)
+
+def get_breaks_by_region():
+    """Surf breaks grouped by region, cached for BREAKS_CACHE_TTL_SECONDS"""
+    global _breaks_cache
+    expires_at, cached = _breaks_cache
+    if cached is not None and time.monotonic() < expires_at:
+        log.info("📍 Using cached surf breaks for %d regions", len(cached))
+        return cached
+    
+    breaks_by_region = fetch_breaks_by_region()
+    # Only cache real results so a failed or empty query is retried next run
+    if breaks_by_region:
+        _breaks_cache = (time.monotonic() + BREAKS_CACHE_TTL_SECONDS, breaks_by_region)
+    return breaks_by_region
+
+def fetch_breaks_by_region():
+    """Get ALL surf breaks in one query, grouped by the regions we have location IDs for"""
     try:
-        response = supabase.table('surf_breaks').select('region').execute()
+        # Only regions we have location IDs for are returned (filtered by PostgREST)
+        response = get_supabase().table('surf_breaks').select('id, region').in_(
+            'region', sorted(VALID_REGIONS)
+        ).execute()
         
-        if response.data:
-            # Get unique regions
-            unique_regions = list(set([break_data['region'] for break_data in response.data]))
-            print(f"📍 Found regions: {unique_regions}")
-            
-            # Filter to only regions we have location IDs for
-            valid_regions = [region for region in unique_regions if region in AUSTRALIAN_SURF_LOCATIONS]
-            print(f"📍 Valid regions to scrape: {valid_regions}")
-            
-            return valid_regions
-        else:
-            print("⚠️  No surf breaks found in database")
-            return []
-            
+        if not response.data:
+            log.warning("⚠️  No surf breaks found in database for configured regions")
+            return {}
+        
+        breaks_by_region = defaultdict(list)
+        for break_data in response.data:
+            breaks_by_region[break_data['region']].append(break_data)
+        
+        log.info("📍 Valid regions to scrape: %s", list(breaks_by_region))
+        
+        for region, breaks in breaks_by_region.items():
+            log.info("✅ Found %d breaks in %s", len(breaks), region)
+            for break_data in breaks:
+                log.debug("  - ID: %s", break_data['id'])
+        
+        return dict(breaks_by_region)
+        
+    except Exception as e:
+        log.error("❌ Error getting surf breaks: %s", e)
+        return {}
+
+def load_scraper_state():
+    """Load the persisted per-location scrape state from disk"""
+    try:
+        with shelve.open(STATE_FILE) as state:
+            return dict(state)
+    except Exception as e:
+        log.warning("⚠️  Could not read scraper state: %s", e)
+        return {}
+
+def save_scraper_state(updates):
+    """Persist per-location scrape state updates to disk"""
+    try:
+        with shelve.open(STATE_FILE) as state:
+            state.update(updates)
     except Exception as e:
-        print(f"❌ Error getting regions: {str(e)}")
-        return []
-
-def run_scraper():
-    """Main scraper function"""
-    print("\n" + "="*60)
-    print(f"🏄 SURF FORECAST SCRAPER - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    print("="*60)
+        log.warning("⚠️  Could not write scraper state: %s", e)
+
+def run_scraper(scraper=None):
+    """Main scraper function (pass a scraper to reuse its connections and caches)"""
+    # Take the clock once so every region in this run uses the same date
+    run_started = datetime.now()
+    run_ts = time.time()
+    start_date = run_started.date().isoformat()
     
-    scraper = WillyWeatherScraper()
+    log.info("=" * 60)
+    log.info("🏄 SURF FORECAST SCRAPER - %s", run_started.strftime('%Y-%m-%d %H:%M:%S'))
+    log.info("=" * 60)
     
-    # Get regions to scrape
-    regions_to_scrape = get_unique_regions_from_database()
+    scraper = scraper or WillyWeatherScraper()
     
-    if not regions_to_scrape:
-        print("❌ No valid regions to scrape")
+    # Get regions to scrape along with their breaks
+    breaks_by_region = get_breaks_by_region()
+    
+    if not breaks_by_region:
+        log.error("❌ No valid regions to scrape")
         return
     
     total_saved = 0
     
-    # Process each region
-    for region in regions_to_scrape:
-        print(f"\n🎯 Processing region: {region}")
-        print("-" * 40)
-        
-        # Get all breaks in this region
-        all_breaks = scraper.get_all_breaks_by_region(region)
-        
-        if not all_breaks:
-            print(f"⚠️  No breaks found for {region}, skipping...")
-            continue
+    # State is read once up front and written once at the end of the run
+    state = load_scraper_state()
+    
+    refreshed = {}
+    failed_locations = set()
+    fetch_failures = {}  # location_id -> consecutive failed fetches
+    pending_records = []
+    pending_locations = []
+    
+    # Work out which regions need fetching, grouped by WillyWeather location so
+    # regions sharing a location ID are fetched once
+    jobs = defaultdict(list)  # location_id -> [(region, all_breaks), ...]
+    for region, all_breaks in breaks_by_region.items():
+        log.debug("🎯 Preparing region: %s", region)
         
         # Get location ID for API call
-        location_config = AUSTRALIAN_SURF_LOCATIONS.get(region)
-        if not location_config:
-            print(f"⚠️  No location ID configured for {region}, skipping...")
+        location_id = LOCATION_IDS.get(region)
+        if location_id is None:
+            log.warning("⚠️  No location ID configured for %s, skipping...", region)
             continue
         
-        location_id = location_config['location_id']
+        previous = state.get(str(location_id), {})
         
-        # Fetch forecast data from API
-        api_data = scraper.get_forecast_data(location_id, region)
+        # Skip locations that were saved recently (e.g. just before a restart)
+        age_hours = (run_ts - previous.get('last_ts', 0)) / 3600
+        if age_hours < MIN_REFRESH_HOURS:
+            log.info("⏭️  %s refreshed %.1fh ago, skipping...", region, age_hours)
+            continue
         
-        if not api_data:
-            print(f"❌ Failed to get API data for {region}")
+        # Skip locations that keep failing until their cooldown is over
+        if previous.get('skip_until', 0) > run_ts:
+            log.warning("⛔ %s failed %d runs in a row, skipping for another %.1fh...",
+                        region, previous.get('failures', 0), (previous['skip_until'] - run_ts) / 3600)
             continue
         
-        # Process forecast data for ALL breaks in the region
-        forecast_records = scraper.process_forecast_data(api_data, region, all_breaks)
+        jobs[location_id].append((region, all_breaks))
         
-        if not forecast_records:
-            print(f"❌ No forecast records generated for {region}")
-            continue
+        # Resume conditional requests from the persisted validators after a restart
+        if previous.get('payload_hash'):
+            scraper.payload_hashes.setdefault(location_id, previous['payload_hash'])
+            scraper.cache_validators.setdefault(location_id, {
+                'etag': previous.get('etag'),
+                'last_modified': previous.get('last_modified')
+            })
+    
+    # Make aliased regions visible in the logs rather than silently sharing a fetch
+    for location_id, regions in jobs.items():
+        if len(regions) > 1:
+            log.info("🔗 %s share WillyWeather location %s, fetching once",
+                     ", ".join(region for region, _ in regions), location_id)
+    
+    # Fetch forecasts concurrently (the requests are I/O-bound and paced by the
+    # scraper's rate limiter), then process each one as it arrives
+    with ThreadPoolExecutor(max_workers=MAX_FETCH_WORKERS) as executor:
+        futures = {
+            executor.submit(
+                scraper.get_forecast_data, location_id, ", ".join(region for region, _ in regions), start_date
+            ): location_id
+            for location_id, regions in jobs.items()
+        }
         
-        # Save forecast data
-        if scraper.save_forecast_data(forecast_records):
-            total_saved += len(forecast_records)
-            print(f"✅ {region} complete - saved {len(forecast_records)} records")
+        for future in as_completed(futures):
+            location_id = futures[future]
+            api_data = future.result()
+            previous = state.get(str(location_id), {})
+            payload_hash = scraper.payload_hashes.get(location_id)
+            
+            if api_data:
+                refreshed[location_id] = payload_hash
+            else:
+                failed_locations.add(location_id)
+                fetch_failures[location_id] = previous.get('failures', 0) + 1
+            
+            # Regions sharing a location get identical forecasts, so their breaks
+            # are processed and saved together
+            region_names = ", ".join(region for region, _ in jobs[location_id])
+            all_breaks = [break_data for _, breaks in jobs[location_id] for break_data in breaks]
+            log.info("🎯 Processing region: %s", region_names)
+            
+            if not api_data:
+                log.error("❌ Failed to get API data for %s", region_names)
+                continue
+            
+            # Nothing to write if the forecast hasn't changed since the last save
+            if payload_hash and payload_hash == previous.get('payload_hash'):
+                log.info("⏭️  Forecast for %s unchanged since last run, skipping save...", region_names)
+                continue
+            
+            # Process forecast data for ALL breaks in the region(s)
+            forecast_records = scraper.process_forecast_data(api_data, region_names, all_breaks)
+            
+            if not forecast_records:
+                log.error("❌ No forecast records generated for %s", region_names)
+                continue
+            
+            # Queue for the single cross-region save below
+            pending_records.extend(forecast_records)
+            pending_locations.append(location_id)
+            log.info("✅ %s processed - %d records queued", region_names, len(forecast_records))
+    
+    # One bulk save for every region, so batches are full instead of one
+    # partial batch per location
+    if pending_records:
+        if scraper.save_forecast_data(pending_records):
+            total_saved = len(pending_records)
         else:
-            print(f"❌ Failed to save data for {region}")
+            log.error("❌ Failed to save data for this run")
+            failed_locations.update(pending_locations)
     
-    print(f"\n🎉 Scraper complete! Total records saved: {total_saved}")
+    # Only mark a location fresh if every region using it was saved (which also
+    # closes its circuit breaker); failed fetches count towards the cooldown
+    updates = {
+        str(location_id): {
+            'last_ts': run_ts,
+            'payload_hash': payload_hash,
+            **scraper.cache_validators.get(location_id, {})
+        }
+        for location_id, payload_hash in refreshed.items()
+        if location_id not in failed_locations
+    }
+    for location_id, failures in fetch_failures.items():
+        previous = state.get(str(location_id), {})
+        skip_until = run_ts + LOCATION_COOLDOWN_HOURS * 3600 if failures >= MAX_CONSECUTIVE_FAILURES else 0
+        updates[str(location_id)] = {**previous, 'failures': failures, 'skip_until': skip_until}
+    save_scraper_state(updates)
+    
+    log.info("🎉 Scraper complete! Total records saved: %d", total_saved)
 
 def main():
-    print("🚀 Starting Individual Break Forecast Scraper")
+    logging.basicConfig(level=os.getenv("LOGLEVEL", "INFO").upper(), format=LOG_FORMAT)
+    log.info("🚀 Starting Individual Break Forecast Scraper")
     
     # Test mode - run once
     if os.getenv("TEST_MODE", "false").lower() == "true":
-        print("🧪 TEST MODE - Running once")
+        log.info("🧪 TEST MODE - Running once")
         run_scraper()
         return
     
     # Production mode - schedule runs
-    print("⏰ PRODUCTION MODE - Scheduling runs")
-    
-    # UPDATED: Schedule scraper to run every 4 hours (was 6 hours)
-    schedule.every(4).hours.do(run_scraper)
+    log.info("⏰ PRODUCTION MODE - Scheduling runs")
     
-    # Run once immediately
-    run_scraper()
+    # One scraper for the life of the process so connections and HTTP cache
+    # validators carry over between scheduled runs
+    scraper = WillyWeatherScraper()
     
-    # Keep running
+    # Run once immediately, then every RUN_INTERVAL_HOURS, sleeping until each
+    # deadline. Deadlines are on the monotonic clock so wall-clock jumps don't
+    # shift them; an overrunning run starts the next one straight away.
+    next_run = time.monotonic()
     while True:
-        schedule.run_pending()
-        time.sleep(60)  # Check every minute
+        run_scraper(scraper)
+        next_run = max(next_run + RUN_INTERVAL_HOURS * 3600, time.monotonic())
+        time.sleep(max(0, next_run - time.monotonic()))
 
 if __name__ == "__main__":
     main()
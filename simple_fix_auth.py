@@ -63,27 +63,32 @@ def fix_break_ownership():
         
         print(f"📍 Found {len(wollongong_breaks)} Wollongong breaks")
         
-        for break_data in wollongong_breaks:
-            if break_data['id'] != working_break_id:
-                # Check if this break has any forecast data
-                forecast_check = supabase.table('forecast_data').select('id').eq('break_id', break_data['id']).limit(1).execute()
-                
-                if not forecast_check.data:
-                    print(f"🗑️  Deleting empty break: {break_data['name']}")
-                    
-                    # Move any surf sessions to working break
-                    move_sessions = supabase.table('surf_sessions').update({
-                        'break_id': working_break_id
-                    }).eq('break_id', break_data['id']).execute()
-                    
-                    if move_sessions.data:
-                        print(f"  📦 Moved {len(move_sessions.data)} sessions to working break")
-                    
-                    # Delete empty break
-                    delete_response = supabase.table('surf_breaks').delete().eq('id', break_data['id']).execute()
-                    
-                    if delete_response.data:
-                        print(f"  ✅ Deleted empty break")
+        # Only breaks with no forecast data are removed. Existence is still checked
+        # per break (limit 1) so a capped result can never make a used break look empty
+        empty_breaks = [
+            break_data for break_data in wollongong_breaks
+            if break_data['id'] != working_break_id
+            and not supabase.table('forecast_data').select('id').eq('break_id', break_data['id']).limit(1).execute().data
+        ]
+        
+        if empty_breaks:
+            empty_break_ids = [break_data['id'] for break_data in empty_breaks]
+            for break_data in empty_breaks:
+                print(f"🗑️  Deleting empty break: {break_data['name']}")
+            
+            # Move any surf sessions to working break, for all empty breaks at once
+            move_sessions = supabase.table('surf_sessions').update({
+                'break_id': working_break_id
+            }).in_('break_id', empty_break_ids).execute()
+            
+            if move_sessions.data:
+                print(f"  📦 Moved {len(move_sessions.data)} sessions to working break")
+            
+            # Delete empty breaks
+            delete_response = supabase.table('surf_breaks').delete().in_('id', empty_break_ids).execute()
+            
+            if delete_response.data:
+                print(f"  ✅ Deleted {len(delete_response.data)} empty breaks")
         
         print("✅ Break cleanup complete!")
         
@@ -107,17 +112,19 @@ def test_current_forecast(break_id):
         print(f"📅 Testing for date: {today}")
         print(f"🎯 Break ID: {break_id}")
         
-        # Try each time slot
-        found_forecast = None
-        for time_slot in time_slots:
-            forecast_response = supabase.table('forecast_data').select('*').eq('break_id', break_id).eq('forecast_date', today).eq('forecast_time', time_slot).execute()
-            
-            if forecast_response.data:
-                found_forecast = forecast_response.data[0]
-                print(f"✅ Found forecast for {time_slot}:")
-                print(f"   🌊 Swell: {found_forecast.get('swell_height')}ft")
-                print(f"   💨 Wind: {found_forecast.get('wind_speed')}kt")
-                break
+        # Fetch every time slot in one query, then take the earliest slot
+        # (slot names don't sort chronologically, so order by time_slots here)
+        forecast_response = supabase.table('forecast_data').select('*').eq('break_id', break_id).eq('forecast_date', today).in_('forecast_time', time_slots).execute()
+        
+        found_forecast = min(
+            forecast_response.data or [],
+            key=lambda forecast: time_slots.index(forecast['forecast_time']),
+            default=None
+        )
+        if found_forecast:
+            print(f"✅ Found forecast for {found_forecast['forecast_time']}:")
+            print(f"   🌊 Swell: {found_forecast.get('swell_height')}ft")
+            print(f"   💨 Wind: {found_forecast.get('wind_speed')}kt")
         
         if found_forecast:
             print("\n🎉 SUCCESS! This should now work in your predictions page!")
@@ -1,7 +1,9 @@
 import asyncio
+import logging
 import os
 from dotenv import load_dotenv
-from scraper import WillyWeatherScraper, AUSTRALIAN_SURF_LOCATIONS
+from scraper import WillyWeatherScraper
+from locations import AUSTRALIAN_SURF_LOCATIONS
 
 # Load environment variables
 load_dotenv()
@@ -24,7 +26,7 @@ async def test_single_location():
         # Test with Wollongong (location ID 17663)
         test_region = "Wollongong"
         location_info = AUSTRALIAN_SURF_LOCATIONS[test_region]
-        location_id = location_info['location_id']
+        location_id = location_info.location_id
         
         print(f"🌊 Testing {test_region} (ID: {location_id})")
         
@@ -43,8 +45,6 @@ async def test_single_location():
 
 async def test_api_connection():
     """Test API connection with a simple request"""
-    import requests
-    
     api_key = os.getenv("WILLY_WEATHER_API_KEY")
     if not api_key:
         print("❌ No API key found")
@@ -56,7 +56,9 @@ async def test_api_connection():
         params = {'forecasts': 'swell,wind,tides', 'days': 1}
         
         print("🔗 Testing API connection...")
-        response = requests.get(url, params=params, timeout=10)
+        # Go through the scraper's pooled session so the same adapter, retries
+        # and compression headers as production are exercised
+        response = WillyWeatherScraper().session.get(url, params=params, timeout=10)
         
         print(f"📡 Response status: {response.status_code}")
         
@@ -71,6 +73,8 @@ async def test_api_connection():
         print(f"❌ Connection test failed: {str(e)}")
 
 if __name__ == "__main__":
+    # Show the scraper's own log output alongside the test prints
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     print("🧪 Running WillyWeather scraper tests...\n")
     
     # Test 1: API Connection
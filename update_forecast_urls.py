@@ -1,97 +1,233 @@
-from supabase import create_client, Client
 from dotenv import load_dotenv
+import functools
+import itertools
+import logging
 import os
+import random
+import sys
+import time
+from collections import defaultdict
+from types import MappingProxyType
 
 # Load environment variables
 load_dotenv()
 
-# Initialize Supabase client
-supabase: Client = create_client(
-    os.getenv("SUPABASE_URL"),
-    os.getenv("SUPABASE_KEY")
-)
+log = logging.getLogger("update_forecast_urls")
 
-# CORRECT WillyWeather URLs (swell forecast pages)
-WILLY_WEATHER_URLS = {
+# Supabase configuration, read once and checked before any client is created
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+
+@functools.lru_cache(maxsize=1)
+def get_supabase():
+    """Create the Supabase client on first use and reuse it afterwards"""
+    # Imported here so importing the URL table (or running --sql) doesn't pull in supabase
+    from supabase import create_client
+
+    if not SUPABASE_URL or not SUPABASE_KEY:
+        log.error("❌ Missing Supabase credentials (SUPABASE_URL / SUPABASE_KEY)")
+        exit(1)
+
+    return create_client(SUPABASE_URL, SUPABASE_KEY)
+
+# Transient PostgREST failures (dropped connections, gateway errors) are retried with
+# exponential backoff and full jitter instead of ending the whole run
+RETRY_ATTEMPTS = 5
+RETRY_BASE_DELAY = 0.2  # seconds
+RETRY_MAX_DELAY = 5.0  # seconds
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+# PostgREST's own 503/504 errors: can't connect to the database, lost connection,
+# schema cache not loaded yet, connection pool timeout
+RETRY_POSTGREST_CODES = frozenset({'PGRST000', 'PGRST001', 'PGRST002', 'PGRST003'})
+# The API gateway's JSON errors carry no code (auth failures such as a 401
+# "Invalid API key" look the same), so only its rate-limit message is retried
+RETRY_GATEWAY_MESSAGES = frozenset({'API rate limit exceeded'})
+
+def is_transient(error):
+    """True for failures worth retrying: network errors, 429/5xx and database connection errors"""
+    import httpx
+    from postgrest.exceptions import APIError
+
+    if isinstance(error, httpx.TransportError):
+        return True
+    if not isinstance(error, APIError):
+        return False
+    # postgrest only passes the HTTP status through (as the code) for non-JSON error
+    # bodies; JSON errors keep their own code, or none for the gateway's
+    if error.code is None:
+        return error.message in RETRY_GATEWAY_MESSAGES
+    return error.code in RETRY_STATUSES or error.code in RETRY_POSTGREST_CODES
+
+def execute_with_retry(query):
+    """Execute a PostgREST query, retrying transient failures"""
+    for attempt in range(1, RETRY_ATTEMPTS + 1):
+        try:
+            return query.execute()
+        except Exception as e:
+            if attempt == RETRY_ATTEMPTS or not is_transient(e):
+                raise
+            delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+            log.warning("⚠️  Supabase request failed (%s), retry %d/%d in %.1fs",
+                        e, attempt, RETRY_ATTEMPTS - 1, delay)
+            time.sleep(delay)
+
+# surf_breaks rows read per request, matching PostgREST's default max rows
+PAGE_SIZE = 1000
+
+# Break IDs per update request; they go in the query string as id=in.(...), so this
+# keeps each URL a few KB long
+IDS_PER_UPDATE = 100
+
+# WillyWeather swell forecast page for each region as (state, page slug)
+WILLY_WEATHER_PAGES = MappingProxyType({
     # New South Wales
-    "Sydney": "https://swell.willyweather.com.au/nsw/sydney.html",
-    "Central Coast": "https://swell.willyweather.com.au/nsw/central-coast.html",
-    "Newcastle": "https://swell.willyweather.com.au/nsw/hunter.html",
-    "Mid North Coast": "https://swell.willyweather.com.au/nsw/mid-north-coast.html",
-    "Byron Bay": "https://swell.willyweather.com.au/nsw/far-north-coast.html",
-    "Wollongong": "https://swell.willyweather.com.au/nsw/illawarra.html",
-    "South Coast": "https://swell.willyweather.com.au/nsw/south-coast.html",
-    "Far North Coast": "https://swell.willyweather.com.au/nsw/far-north-coast.html",
+    "Sydney": ("nsw", "sydney"),
+    "Central Coast": ("nsw", "central-coast"),
+    "Newcastle": ("nsw", "hunter"),
+    "Mid North Coast": ("nsw", "mid-north-coast"),
+    "Byron Bay": ("nsw", "far-north-coast"),
+    "Wollongong": ("nsw", "illawarra"),
+    "South Coast": ("nsw", "south-coast"),
+    "Far North Coast": ("nsw", "far-north-coast"),
     
     # Queensland
-    "Gold Coast": "https://swell.willyweather.com.au/qld/gold-coast.html",
-    "Sunshine Coast": "https://swell.willyweather.com.au/qld/sunshine-coast.html",
-    "Fraser Coast": "https://swell.willyweather.com.au/qld/fraser-coast.html",
-    "Capricorn Coast": "https://swell.willyweather.com.au/qld/capricornia.html",
-    "Mackay": "https://swell.willyweather.com.au/qld/mackay.html",
-    "Townsville": "https://swell.willyweather.com.au/qld/townsville.html",
-    "Cairns": "https://swell.willyweather.com.au/qld/far-north-queensland.html",
+    "Gold Coast": ("qld", "gold-coast"),
+    "Sunshine Coast": ("qld", "sunshine-coast"),
+    "Fraser Coast": ("qld", "fraser-coast"),
+    "Capricorn Coast": ("qld", "capricornia"),
+    "Mackay": ("qld", "mackay"),
+    "Townsville": ("qld", "townsville"),
+    "Cairns": ("qld", "far-north-queensland"),
     
     # Victoria
-    "Melbourne": "https://swell.willyweather.com.au/vic/melbourne.html",
-    "Torquay": "https://swell.willyweather.com.au/vic/surf-coast.html",
-    "Phillip Island": "https://swell.willyweather.com.au/vic/gippsland.html",
-    "East Gippsland": "https://swell.willyweather.com.au/vic/gippsland.html",
-    "West Coast": "https://swell.willyweather.com.au/vic/surf-coast.html",
+    "Melbourne": ("vic", "melbourne"),
+    "Torquay": ("vic", "surf-coast"),
+    "Phillip Island": ("vic", "gippsland"),
+    "East Gippsland": ("vic", "gippsland"),
+    "West Coast": ("vic", "surf-coast"),
     
     # South Australia
-    "Adelaide": "https://swell.willyweather.com.au/sa/adelaide.html",
-    "Fleurieu Peninsula": "https://swell.willyweather.com.au/sa/fleurieu-peninsula.html",
-    "Yorke Peninsula": "https://swell.willyweather.com.au/sa/yorke-peninsula.html",
-    "Eyre Peninsula": "https://swell.willyweather.com.au/sa/eyre-peninsula.html",
-    "Kangaroo Island": "https://swell.willyweather.com.au/sa/kangaroo-island.html",
+    "Adelaide": ("sa", "adelaide"),
+    "Fleurieu Peninsula": ("sa", "fleurieu-peninsula"),
+    "Yorke Peninsula": ("sa", "yorke-peninsula"),
+    "Eyre Peninsula": ("sa", "eyre-peninsula"),
+    "Kangaroo Island": ("sa", "kangaroo-island"),
     
     # Western Australia
-    "Perth": "https://swell.willyweather.com.au/wa/perth.html",
-    "Margaret River": "https://swell.willyweather.com.au/wa/south-west.html",
-    "Geraldton": "https://swell.willyweather.com.au/wa/mid-west.html",
-    "Esperance": "https://swell.willyweather.com.au/wa/goldfields-esperance.html",
-    "Albany": "https://swell.willyweather.com.au/wa/great-southern.html",
-    "Exmouth": "https://swell.willyweather.com.au/wa/pilbara.html",
-    "Broome": "https://swell.willyweather.com.au/wa/kimberley.html",
+    "Perth": ("wa", "perth"),
+    "Margaret River": ("wa", "south-west"),
+    "Geraldton": ("wa", "mid-west"),
+    "Esperance": ("wa", "goldfields-esperance"),
+    "Albany": ("wa", "great-southern"),
+    "Exmouth": ("wa", "pilbara"),
+    "Broome": ("wa", "kimberley"),
     
     # Tasmania
-    "Hobart": "https://swell.willyweather.com.au/tas/hobart.html",
-    "Launceston": "https://swell.willyweather.com.au/tas/launceston.html",
-    "North West Coast": "https://swell.willyweather.com.au/tas/north-west.html",
-    "East Coast": "https://swell.willyweather.com.au/tas/east-coast.html"
-}
+    "Hobart": ("tas", "hobart"),
+    "Launceston": ("tas", "launceston"),
+    "North West Coast": ("tas", "north-west"),
+    "East Coast": ("tas", "east-coast")
+})
+
+# surf_breaks column holding the forecast link. The name predates the WillyWeather switch,
+# but other surf_breaks readers (e.g. debug_database.py) still use it, so renaming it is a
+# schema migration - after which only this constant needs to change here
+URL_COLUMN = "swellnet_url"
+
+WILLY_WEATHER_URL_TEMPLATE = "https://swell.willyweather.com.au/{state}/{slug}.html"
+
+@functools.lru_cache(maxsize=None)
+def url_for(region):
+    """CORRECT WillyWeather swell forecast URL for a region, or None if it has no page"""
+    page = WILLY_WEATHER_PAGES.get(region)
+    if page is None:
+        return None
+    state, slug = page
+    return WILLY_WEATHER_URL_TEMPLATE.format(state=state, slug=slug)
+
+def sql_literal(value):
+    """Quote a string as a Postgres literal"""
+    return "'" + value.replace("'", "''") + "'"
+
+def forecast_urls_sql():
+    """One UPDATE statement that sets every known region's URL, for running through psql"""
+    values = ",\n    ".join(
+        f"({sql_literal(region)}, {sql_literal(url_for(region))})" for region in WILLY_WEATHER_PAGES
+    )
+    return (
+        f"update surf_breaks set {URL_COLUMN} = v.url\n"
+        f"from (values\n    {values}\n) as v(region, url)\n"
+        "where surf_breaks.region = v.region\n"
+        f"  and surf_breaks.{URL_COLUMN} is distinct from v.url;"
+    )
 
 def update_forecast_urls():
     """Update all surf break URLs to use correct WillyWeather swell forecast pages"""
     try:
-        print("🔄 Updating forecast URLs to WillyWeather swell forecasts...")
+        log.info("🔄 Updating forecast URLs to WillyWeather swell forecasts...")
         
-        # Get all surf breaks
-        response = supabase.table('surf_breaks').select('*').execute()
+        supabase = get_supabase()
+        unchanged_count = 0
+        regions_seen = set()
+        breaks_by_url = defaultdict(list)  # target URL -> breaks that need it
         
-        updated_count = 0
-        for break_data in response.data:
-            region = break_data['region']
-            willy_url = WILLY_WEATHER_URLS.get(region)
+        # Walk surf_breaks a page at a time (PostgREST caps unpaged selects anyway),
+        # collecting the breaks whose URL is wrong under the URL they should have
+        for offset in itertools.count(0, PAGE_SIZE):
+            page = supabase.table('surf_breaks').select(f'id, name, region, {URL_COLUMN}')
+            response = execute_with_retry(page.order('id').range(offset, offset + PAGE_SIZE - 1))
             
-            if willy_url:
-                # Update the URL
-                supabase.table('surf_breaks').update({
-                    'swellnet_url': willy_url  # Keep the column name for now
-                }).eq('id', break_data['id']).execute()
+            for break_data in response.data:
+                region = break_data['region']
+                regions_seen.add(region)
+                willy_url = url_for(region)
+                
+                # Unknown regions are reported once, after the walk
+                if not willy_url:
+                    continue
                 
-                print(f"✅ Updated {break_data['name']} ({region}) -> {willy_url}")
-                updated_count += 1
-            else:
-                print(f"⚠️  No WillyWeather URL found for {region}")
+                # Nothing to write (or log) when the URL is already correct
+                if break_data.get(URL_COLUMN) == willy_url:
+                    unchanged_count += 1
+                else:
+                    breaks_by_url[willy_url].append(break_data)
+                    log.debug("📝 Queued %s (%s) -> %s", break_data['name'], region, willy_url)
+            
+            if len(response.data) < PAGE_SIZE:
+                break
+        
+        # Only the URL column is written, one update per target URL (and ID chunk)
+        # rather than one per break, so concurrent edits to other columns are kept
+        updated_count = 0
+        for willy_url, breaks in breaks_by_url.items():
+            for start in range(0, len(breaks), IDS_PER_UPDATE):
+                chunk = breaks[start:start + IDS_PER_UPDATE]
+                execute_with_retry(supabase.table('surf_breaks').update(
+                    {URL_COLUMN: willy_url}, returning='minimal'
+                ).in_('id', [break_data['id'] for break_data in chunk]))
+                
+                # Only reported once the write has gone through
+                for break_data in chunk:
+                    log.info("✅ Updated %s (%s) -> %s", break_data['name'], break_data['region'], willy_url)
+                updated_count += len(chunk)
+        
+        # One warning per unknown region rather than one per break in it
+        for region in sorted(regions_seen - WILLY_WEATHER_PAGES.keys(), key=str):
+            log.warning("⚠️  No WillyWeather URL found for %s", region)
         
-        print(f"\n🎉 Successfully updated {updated_count} surf breaks!")
-        print("📱 Forecast links will now open WillyWeather swell forecast pages")
-        print("\n💡 Test a few links in your app to make sure they work!")
+        log.info("\n🎉 Successfully updated %d surf breaks!", updated_count)
+        if unchanged_count:
+            log.info("⏭️  %d surf breaks already had the correct URL", unchanged_count)
+        log.info("📱 Forecast links will now open WillyWeather swell forecast pages")
+        log.info("\n💡 Test a few links in your app to make sure they work!")
         
     except Exception as e:
-        print(f"❌ Error updating URLs: {str(e)}")
+        log.error("❌ Error updating URLs: %s", e)
 
 if __name__ == "__main__":
-    update_forecast_urls()
\ No newline at end of file
+    logging.basicConfig(level=os.getenv("LOGLEVEL", "INFO").upper(), format="%(message)s")
+    # --sql prints the whole update as SQL (e.g. for psql -f) instead of running it over the API
+    if "--sql" in sys.argv[1:]:
+        print(forecast_urls_sql())
+    else:
+        update_forecast_urls()
\ No newline at end of file